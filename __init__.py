@@ -1,5 +1,4 @@
-import imp
+import importlib
 import os
 if os.path.isdir('csv2wiki'):
-    csv2wiki = imp.load_source('csv2wiki', 'csv2wiki/csv2wiki')
-
+    csv2wiki = importlib.import_module('csv2wiki')
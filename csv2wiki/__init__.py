@@ -398,6 +398,15 @@ since it's how the config file is indicated in the first place.
                        convert just 1/N rows, spaced evenly across the
                        CSV file and selected deterministically.
 
+  --jobs N             Save up to N pages to the wiki at once, using
+                       N concurrent connections.  The default is 1,
+                       i.e., pages are saved one after another.  Saving
+                       pages is mostly waiting on the network, so a
+                       handful of jobs can speed up a big conversion
+                       considerably; but be kind to the wiki server.
+                       (mwclient already backs off and retries when the
+                       wiki reports it is lagging or overloaded.)
+
   --skip-rows N        Skip N lines after the header.  Useful when there's
                        extra information as a secondary header, such as
                        column type, or units.
@@ -420,6 +429,10 @@ Dependencies and Troubleshooting
   modules.  If any of them are not present, you should get an error 
   message explaining what to do.
 
+* If the optional 'pyarrow' module is installed, csv2wiki uses its
+  native CSV parser to read the CSV file, which is much faster on
+  large inputs.  Without it, Python's built-in 'csv' module is used.
+
 * You may need to convert carriage returns to linefeeds
 
   If your CSV input file uses only carriage returns (CR) for line
@@ -498,43 +511,117 @@ csv2wiki is free / open source software under the AGPL-3.0 license.
 Please run with --version option for details.
 """
 
+import codecs
+import concurrent.futures
 import csv
+import functools
 import getopt, sys
 import configparser
+import contextlib
+import importlib
+import io
 import re
+import string
+import threading
 import warnings
 
-# For exception matching.
-import requests
-
-# Handle non-core modules specially.
-non_core_import_failures = []
-try:
-    import mwclient
-except ImportError:
-    non_core_import_failures.append("mwclient")
-try:
-    import unidecode
-except ImportError:
-    non_core_import_failures.append("unidecode")
+# Handle non-core modules specially.  They are slow to import, so
+# they're only imported when first needed (which means, e.g., that
+# --help and --show-columns never import them at all), and if one is
+# missing at that point, we explain what to do.
+non_core_modules = {}
+
+def _require_module(name):
+    """Return the non-core module NAME, importing it on first use.
+    If it can't be imported, say how to install it and exit."""
+    module = non_core_modules.get(name)
+    if module is None:
+        try:
+            module = importlib.import_module(name)
+        except ImportError:
+            sys.stderr.write(
+                "ERROR: The '%s' module was not available for import.\n"
+                "       You need to install it by doing something like this:\n"
+                "\n"
+                "         $ sudo pip3 install %s\n" % (name, name))
+            sys.exit(1)
+        non_core_modules[name] = module
+    return module
+
+def _optional_module(name):
+    """Return the non-core module NAME, importing it on first use, or
+    None if it can't be imported.  This is for modules we can do
+    without; see _require_module() for the ones we can't."""
+    if name not in non_core_modules:
+        try:
+            non_core_modules[name] = importlib.import_module(name)
+        except ImportError:
+            non_core_modules[name] = None
+    return non_core_modules[name]
+
+def _require_mwclient():
+    """Return the mwclient module, importing it if necessary."""
+    return _require_module("mwclient")
+
+def _require_requests():
+    """Return the requests module (which mwclient is built on),
+    importing it if necessary."""
+    return _require_module("requests")
+
+def _require_unidecode():
+    """Return the unidecode module, importing it if necessary."""
+    return _require_module("unidecode")
+
+def _require_bs4():
+    """Return the bs4 (BeautifulSoup) module, importing it if necessary."""
+    return _require_module("bs4")
+
+# Cells are often fragments that BeautifulSoup has opinions about
+# (e.g., that they look like a filename or URL); we don't care.
+warnings.filterwarnings("ignore", category=UserWarning, module='bs4')
+
+# Matches an "&amp;" followed later by a ";" in a page title; see
+# WikiSession._process_row().
+_AMP_RE = re.compile(r"&amp;.*?;")
+
+# Matches a simple anchor, <a href="url">text</a>, that has nothing
+# else in it for BeautifulSoup to interpret; see wikify_anchors().
+_SIMPLE_ANCHOR_RE = re.compile(
+    r"""<a\s+href=(["'])([^"'<>&]*)\1\s*>([^<>&]*)</a>""", re.IGNORECASE)
+
+# What BeautifulSoup counts as whitespace: it turns a string of text
+# that is nothing but these into a single space or newline.
+_SOUP_SPACES = " \n\t\x0c\r"
+
+def _is_plain_text(cell):
+    """Return True if CELL is plain text, which BeautifulSoup would
+    hand back unchanged, so WikiSession._wikiize_cell() needn't parse
+    it.  (Any "&", "<", or ">" would come back entity-escaped, and a
+    cell that is nothing but whitespace would be collapsed.)"""
+    return ("<" not in cell and ">" not in cell and "&" not in cell
+            and (cell == "" or cell.strip(_SOUP_SPACES) != ""))
+
+# Characters that can't appear in a MediaWiki page title, each mapped
+# to "-"; see WikiSession._wiki_escape_page_title().
+_BAD_TITLE_CHARS = str.maketrans({c: "-" for c in "#<>[]{|}"})
+
+# Spreadsheet cells can hold whole documents, so don't let the csv
+# module reject long fields (its default cap is 128 KiB).  sys.maxsize
+# doesn't fit in a C long on some platforms, hence the fallback.
 try:
-    from bs4 import BeautifulSoup
-except ImportError:
-    non_core_import_failures.append("bs4")
-if len(non_core_import_failures) > 0:
-    sys.stderr.write(
-        "ERROR: One or more modules were not available for import.\n")
-    sys.stderr.write(
-        "       You need to install them by doing something like this:\n")
-    sys.stderr.write("\n")
-    for mod in non_core_import_failures:
-        sys.stderr.write("         $ sudo pip3 install %s\n" % mod)
-    sys.exit(1)
+    csv.field_size_limit(sys.maxsize)
+except OverflowError:
+    csv.field_size_limit(2**31 - 1)
 
 # TODO: This function should no longer be necessary.  csv2wiki now
 # only supports UTF-8 input, which Python is well-equipped to handle.
 # However, if we're going to get rid of this function, we should be
 # sure that doing so really makes no difference in the output.
+#
+# Callers pass the same strings over and over (every row in a
+# category, for example), so results are cached.  The cache is
+# bounded, since some columns have a distinct value in every row.
+@functools.lru_cache(maxsize=65536)
 def massage_string(s):
     """Convert non-ASCII string S to nearest lower ASCII equivalent."""
     # TODO: This is really a todo for the unidecode module
@@ -557,9 +644,49 @@ def massage_string(s):
     # /usr/local/lib/python2.7/dist-packages/unidecode/__init__.py has
     # the details (on my system, at least).
     #
-    # Anyway, the solution is to call unidecode_expect_nonascii()
-    # directly and not worry that that's slightly slower overall.
-    return unidecode.unidecode_expect_nonascii(s)
+    # Anyway, the solution is to do the ASCII check ourselves:
+    # str.isascii() is cheap, and plain ASCII needs no conversion at
+    # all, so only genuinely non-ASCII strings reach unidecode, via
+    # unidecode_expect_nonascii(), which is the right entry point for
+    # them.
+    if s.isascii():
+        return s
+    return _require_unidecode().unidecode_expect_nonascii(s)
+
+def compile_template(tmpl):
+    """Return a compiled form of format string TMPL for render_template().
+
+    The compiled form is a list of (LITERAL, COLUMN) pairs, where
+    LITERAL is a string and COLUMN is the integer N from a "{N}" that
+    follows LITERAL in TMPL (or None for trailing literal text).
+
+    If TMPL uses any str.format() feature beyond plain "{N}" fields,
+    such as format specs or conversions, return None; render_template()
+    then falls back to calling TMPL.format()."""
+    compiled = []
+    try:
+        for literal, field, spec, conversion in string.Formatter().parse(tmpl):
+            if field is None:
+                compiled.append((literal, None))
+            elif field.isascii() and field.isdigit() \
+                 and not spec and conversion is None:
+                compiled.append((literal, int(field)))
+            else:
+                return None
+    except ValueError:
+        # Malformed template; let str.format() raise the real error
+        # at render time, just as it always has.
+        return None
+    return compiled
+
+def render_template(tmpl, compiled, row):
+    """Return format string TMPL with the elements of list ROW
+    substituted for its "{N}" fields, i.e., TMPL.format(*ROW).
+    COMPILED is the result of compile_template(TMPL)."""
+    if compiled is None:
+        return tmpl.format(*row)
+    return "".join([literal if col is None else literal + row[col]
+                    for literal, col in compiled])
 
 class WikiSectionSkel():
     """One section (or subsection, etc) of a wiki page.  
@@ -570,6 +697,12 @@ class WikiSectionSkel():
     the list is the order of sections in the page.  
 
     This corresponds to the 'sec_map' option in the config file."""
+    # A page structure can have many sections, and instances are
+    # consulted for every page, so skip the per-instance __dict__.
+    __slots__ = ("level", "title", "content_specifiers",
+                 "_compiled_title", "_compiled_content", "_fast_cols",
+                 "_content_cols")
+
     def __init__(self, level, title=None, content_specifiers=None):
         """Create one (sub)section on a wiki page.
 
@@ -595,15 +728,96 @@ class WikiSectionSkel():
         # order not to have every skel accumulate every column, we use
         # the flag value None and then shim [] in as the proper default.
         self.content_specifiers = [] if content_specifiers is None else content_specifiers
+        # Set by compile(), once all content specifiers are known.
+        self._compiled_title = None
+        self._compiled_content = []
+        self._fast_cols = []
+        self._content_cols = []
+
+    def compile(self):
+        """Precompile the title and content specifiers for rendering.
+        Call this after all content specifiers have been added."""
+        self._compiled_title = compile_template(self.title)
+        self._compiled_content = [compile_template(content_specifier)
+                                  for content_specifier in self.content_specifiers]
+        # The most common content specifier by far is a lone "{N}",
+        # which is just cell N; note those so rendering can skip the
+        # template machinery entirely.
+        self._fast_cols = [compiled[0][1]
+                           if compiled is not None and len(compiled) == 1
+                              and compiled[0][0] == ""
+                           else None
+                           for compiled in self._compiled_content]
+        # The columns each content specifier refers to, so rendering
+        # can tell when they're all empty.  None means it refers to
+        # no columns, or we can't tell which.
+        self._content_cols = [tuple(col for literal, col in compiled
+                                    if col is not None) or None
+                              if compiled is not None else None
+                              for compiled in self._compiled_content]
 
     def __str__(self):
         """String representation, normally used only for debugging."""
         dot_pad = "." * self.level
         spc_pad = " " * self.level
-        return "" \
-            + dot_pad + " section '%s':\n" % self.title  \
-            + spc_pad + " level:          %d\n"  % self.level  \
-            + spc_pad + " content_specifiers:  %s\n"  % self.content_specifiers
+        return ("%s section '%s':\n"
+                "%s level:          %d\n"
+                "%s content_specifiers:  %s\n"
+                % (dot_pad, self.title,
+                   spc_pad, self.level,
+                   spc_pad, self.content_specifiers))
+
+
+# There are two kinds of lines in a sec_map:
+#
+#   1) New section indicator (starts with dots)
+#   2) Text line (starts with a pipe)
+#   3) Comment line (starts with a pound sign)
+#      - This is not handled explicitly here because
+#        it's handled by the python config parser
+#        before we get the sec_map
+#
+# These regexps help parse_sec_map() figure out which kind it's got.
+# They are only ever used with fullmatch(), so ".*" runs to the end
+# of the line without any backtracking.
+_SEC_MAP_DOT_RE = re.compile(r"(\.+)\s*(.*)")
+_SEC_MAP_TXT_RE = re.compile(r"\|\s*(.*)")
+
+def parse_sec_map(sec_map):
+    """Return a list of WikiSectionSkel objects parsed from string SEC_MAP,
+    the value of the 'sec_map' config option, with their templates
+    already compiled."""
+    section_structure = []
+
+    # Because of the way Python parses ConfigParser syntax,
+    # the format we get the sec_map in is one big string,
+    # splittable on line breaks into a list of lines.
+    #
+    # Each line is tested with a single fullmatch() call per regexp,
+    # which anchors at both ends of the line and gives us the groups.
+    for line in sec_map.splitlines():
+        # As usual, I wish Python had Lisp-style 'cond'.
+        m = _SEC_MAP_DOT_RE.fullmatch(line)
+        if m:
+            section_structure.append(
+                WikiSectionSkel(len(m.group(1)),
+                                m.group(2) or ""))
+            continue
+        m = _SEC_MAP_TXT_RE.fullmatch(line)
+        if m:
+            if len(section_structure) == 0:
+                section_structure.append(WikiSectionSkel(0, ""))
+            section_structure[-1].content_specifiers.append(m.group(1))
+        else:
+            raise Exception("ERROR: "
+                            + "invalid line in sec_map:\n" \
+                            + "       '%s'\n" % line)
+
+    # Do the "{N}" parsing once here, rather than once per row.
+    for skel in section_structure:
+        skel.compile()
+
+    return section_structure
 
 
 class WikiSession:
@@ -612,7 +826,8 @@ class WikiSession:
     # based on a new config parameter 'wiki_type'.  At least the
     # _do_skel(), _make_page(), _save_page(), and methods would
     # need to be updated.
-    def __init__(self, config, csv_input, null_as_value, msg_out, dry_run_out, make_non_editable):
+    def __init__(self, config, csv_input, null_as_value, msg_out, dry_run_out, make_non_editable,
+                 jobs=1):
         """Start a wiki session, taking login parameters from CONFIG and
         column header information (if needed) from CSV_INPUT.
 
@@ -631,17 +846,25 @@ class WikiSession:
         While it is possible for both this and MSG_OUT to be not None,
         that may cause confusing output, so consider passing None for
         MSG_OUT if you use DRY_RUN_OUT.
+
+        JOBS is the maximum number of pages to save to the wiki
+        concurrently while making pages for the CSV rows.
         """
         self._csv_input          = csv_input
         self._null_as_value      = null_as_value
         self._msg_out            = msg_out
         self._dry_run_out        = dry_run_out
         self._make_non_editable  = make_non_editable
+        self._jobs               = jobs
+        self._executor           = None  # set while saving pages in parallel
+        self._pending_saves      = []    # futures for in-flight page saves
         self._site_conn          = None  # will be a mwclient Site object
+        self._local              = threading.local()  # per-thread Site
         self._wiki_url           = config['wiki_url']
         self._username           = config['username']
         self._password           = config['password']
         self._title_tmpl         = config['title_tmpl']
+        self._compiled_title_tmpl = compile_template(self._title_tmpl)
         self._toc_name           = config.get('toc_name', None)
         self._cat_col            = config.get('cat_col', None)
         self._default_cat        = config.get('default_cat', None)
@@ -657,9 +880,9 @@ class WikiSession:
         if self._cat_col is not None:
             self._cat_col = int(self._cat_col)
 
-        # This maps page titles to True, so this session can remember
-        # every page created and thus protect against double creation.
-        self._page_titles = {}
+        # The set of page titles saved so far, so this session can
+        # protect against double creation.
+        self._page_titles = set()
 
         # Map category names to lists, where the elements of each list are
         # the titles of the pages in the corresponding category.  The
@@ -667,87 +890,139 @@ class WikiSession:
         # (If categories are not in use at all, or if no pages have a
         # category, then all pages would be listed under "".)
         self._categories = {}
+
+        # Map category cells, after massage_string(), to their escaped
+        # category names; see _update_category_cell().
+        self._cat_esc_cache = {}
+
+        # The total length of all the lists in self._categories, i.e.,
+        # how many times a page has been put in a category so far.
+        self._total_categorized = 0
     
         # Determines how many "0"s to prepend to a row number.
         if self._csv_input is not None:
-            self._row_num_fmt = "{:0"                                      \
-                                + str(len(str(self._csv_input.row_count))) \
-                                + "}"
+            # (A "%0Nd" format is cheaper per row than "{:0N}".format.)
+            self._row_num_fmt = "%%0%dd" % len(str(self._csv_input.row_count))
+
+        # Heading lines for self._section_structure, in the same order;
+        # see _render_section_headings().
+        self._section_headings = []
 
         if self._path_to_api is None:
             self._path_to_api = "/"
 
         if self._last_cat is not None:
             # It's always used case-insensitively and w/o surrounding spaces
-            self._last_cat = self._last_cat.strip().lower()
+            self._last_cat = sys.intern(self._last_cat.strip().lower())
+
+        if self._default_cat is not None:
+            # Category names are interned (see _update_category_cell).
+            self._default_cat = sys.intern(self._default_cat)
 
         self._csv2wiki_url = 'https://github.com/OpenTechStrategies/csv2wiki'
 
-        if sec_map is not None:
-            # We need to turn sec_map into self._section_structure.
+        # Put a colophon at the end of every page, because users need to
+        # know that the page was auto-generated.  For one thing, that
+        # might make them think twice about manually editing it, lest
+        # their changes be overwritten by a subsequent run of the script.
+        #
+        # We allow the configuration to omit through the omit_colophon option.
+        #
+        # It's the same for every page, so it's built just once, here.
+        self._colophon = ""
+        if not self._omit_colophon:
+            self._colophon = "".join([
+                "\n\n",
+                '<span style="font-size:75%" >',
+                "'''Colophon:''' This page was generated by ",
+                '[', self._csv2wiki_url, ' csv2wiki]. ',
+                'Manual changes to this page might be ',
+                'overwritten by a subsequent run of csv2wiki.',
+                '</span>',
+                '\n'])
+        # The log message (edit message, commit message, whatever): the
+        # metadata you record in MediaWiki whenever you submit a change.
+        self._edit_msg = "Page generated by csv2wiki (" + self._csv2wiki_url + ")."
 
-            # There are two kinds of lines:
-            #
-            #   1) New section indicator (starts with dots)
-            #   2) Text line (starts with a pipe)
-            #   3) Comment line (starts with a pound sign)
-            #      - This is not handled explicitly here because
-            #        it's handled by the python config parser
-            #        before we get the sec_map
-            #
-            # These regexps help us figure out which kind we've got.
-            dot_matcher = re.compile("^(\\.+)\\s*(.*)$")
-            txt_matcher = re.compile("^\\|\\s*(.*)$")
-
-            # Because of the way Python parses ConfigParser syntax,
-            # the format we get the sec_map in is one big string,
-            # splittable on line breaks into a list of lines.
-            for line in sec_map.splitlines():
-                # As usual, I wish Python had Lisp-style 'cond'.
-                if dot_matcher.search(line):
-                    m = dot_matcher.match(line)
-                    self._section_structure.append(
-                        WikiSectionSkel(m.group(1).count("."),
-                                        m.group(2) or ""))
-                elif txt_matcher.search(line):
-                    if len(self._section_structure) == 0:
-                        self._section_structure.append(WikiSectionSkel(0, ""))
-                    m = txt_matcher.match(line)
-                    self._section_structure[-1].content_specifiers.append(m.group(1))
-                else:
-                    raise Exception("ERROR: "
-                                    + "invalid line in sec_map:\n" \
-                                    + "       '%s'\n" % line)
+        if sec_map is not None:
+            self._section_structure = parse_sec_map(sec_map)
         elif csv_input is not None:
             # no sec_map provided, so contruct trivial one from headers
             #
             # if we're operating in non csv_input mode, then we don't really
             # need to construct a sec_map
             for i in range(1, len(csv_input.headers)):
-                self._section_structure.append(
-                    WikiSectionSkel(1, "{%d}" % i, (i,)))
+                skel = WikiSectionSkel(1, "{%d}" % i, ["{%d}" % i])
+                skel.compile()
+                self._section_structure.append(skel)
+
+        # The columns whose cells need wikiizing; see _process_row().
+        self._wikiized_cols = self._find_wikiized_cols()
 
         # Connect to the site.
         if self._dry_run_out is None:
+            mwclient = _require_mwclient()
+            # For exception matching and connection pooling.
+            requests = _require_requests()
             try:
                 (scheme, host) = self._wiki_url.split("://")
                 self._site_conn = mwclient.Site(host, path=self._path_to_api, scheme=scheme)
 
+                # mwclient makes every request through one persistent
+                # requests.Session, so HTTP keep-alive already spares us
+                # a TCP/TLS handshake per page.  Mount an adapter whose
+                # connection pool holds at least one connection per save
+                # job, so that connections keep getting reused even with
+                # self._jobs requests in flight; otherwise the surplus
+                # connections would be opened and thrown away each time.
+                # (We mount on mwclient's own session rather than passing
+                # ours in via 'pool=', which would skip mwclient's setup
+                # of the User-Agent header.)
+                #
+                # There's no transport-level retry here: mwclient already
+                # retries on maxlag and on server errors, and blindly
+                # re-sending an edit POST isn't safe anyway.
+                adapter = requests.adapters.HTTPAdapter(
+                    pool_connections=4,
+                    pool_maxsize=max(self._jobs,
+                                     requests.adapters.DEFAULT_POOLSIZE))
+                self._site_conn.connection.mount("https://", adapter)
+                self._site_conn.connection.mount("http://", adapter)
+
             except requests.exceptions.HTTPError as err: 
-                sys.stderr.write("ERROR: failed to connect to wiki URL '%s'\n" % self._wiki_url)
-                sys.stderr.write("       Error details:\n")
-                sys.stderr.write("       ('%s')\n" % err)
+                sys.stderr.write("ERROR: failed to connect to wiki URL '%s'\n"
+                                 "       Error details:\n"
+                                 "       ('%s')\n" % (self._wiki_url, err))
                 sys.exit(1)
         
             try:
                 self._site_conn.login(self._username, self._password)
             except mwclient.errors.LoginError as err:
                 sys.stderr.write("ERROR: Unable to log in to wiki; "
-                                 "check that username and password are correct.\n")
-                sys.stderr.write("       Error details:\n")
-                sys.stderr.write("       ('%s')\n" % err)
+                                 "check that username and password are correct.\n"
+                                 "       Error details:\n"
+                                 "       ('%s')\n" % err)
                 sys.exit(1)
 
+            # This thread uses the main Site; see _thread_site().
+            self._local.site = self._site_conn
+
+    def _find_wikiized_cols(self):
+        """Return a sorted list of the column numbers whose cells can
+        end up on a page: those used by any section's content
+        specifiers, plus the category column.  Return None if that
+        can't be determined (because some content specifier is too
+        fancy for compile_template()), meaning use every column."""
+        cols = set()
+        for skel in self._section_structure:
+            for compiled in skel._compiled_content:
+                if compiled is None:
+                    return None
+                cols.update(col for literal, col in compiled if col is not None)
+        if self._cat_col is not None:
+            cols.add(self._cat_col)
+        return sorted(cols)
+
     def _wiki_escape_page_title(self, s):
         """Return a wiki-escaped version of STRING."""
         # TODO: This is MediaWiki-specific right now.
@@ -770,11 +1045,10 @@ class WikiSession:
         # titles, so presumably the fact that we're no longer
         # replacing "/" below couldn't possibly result in any breakage
         # that wasn't happning before anyway... right?
-        for c in ["#", "<", ">", "[", "]", "{", "|", "}",]:
-            if s.find(c) != -1:
-                # Just replace any problematic characters with "-",
-                # and hope that still results in unique page titles.
-                s = s.replace(c, "-")
+        #
+        # Just replace any problematic characters with "-", and hope
+        # that still results in unique page titles.
+        s = s.translate(_BAD_TITLE_CHARS)
         # Did you know that MediaWiki limits page titles to 255 bytes?
         # Not characters, but actual bytes?  And did you know that if
         # you use the API to try to create a page with a title longer
@@ -785,8 +1059,12 @@ class WikiSession:
         # 'includes/Title.php', until you finally DuckDuckGoogle in
         # desparation and, by some miracle, manage to stumble across
         # https://www.mediawiki.org/wiki/Page_title_size_limitations?
-        while len(bytes(s, "UTF-8")) > 255:
-            s = s[:-1]
+        #
+        # Trim to 255 bytes, dropping any character that would be cut
+        # in half.  (Encoding just once matters for long titles.)
+        encoded = s.encode("UTF-8")
+        if len(encoded) > 255:
+            s = encoded[:255].decode("UTF-8", "ignore")
         return s
 
     def _maybe_msg(self, msg):
@@ -794,70 +1072,184 @@ class WikiSession:
         if self._msg_out is not None:
             self._msg_out.write(msg)
 
-    def _save_page(self, page_title, text):
+    def _save_page(self, page_title, text, created_msg=None):
         """Make page PAGE_TITLE in this wiki have TEXT,
-        with the standard colophon appended."""
+        with the standard colophon appended.
+
+        TEXT is either a string or a list of strings that together
+        make up the page text.  A list saves joining the pieces of a
+        big page just to write them out again in a dry run.
+
+        If CREATED_MSG is not None, pass it to _maybe_msg() once the
+        page has actually been saved (which, inside _parallel_saves(),
+        is some time after this returns)."""
         if page_title in self._page_titles:
             raise Exception("ERROR: tried to save page '%s' " % page_title
                             + "a second time")
-        self._page_titles[page_title] = True
-        # Put a colophon at the end of every page, because users need to
-        # know that the page was auto-generated.  For one thing, that
-        # might make them think twice about manually editing it, lest
-        # their changes be overwritten by a subsequent run of the script.
-        #
-        # We allow the configuration to omit through the omit_colophon option
-        colophon = ""
-        if not self._omit_colophon:
-            colophon = "\n\n"                                           \
-                       + '<span style="font-size:75%" >'                \
-                       + "'''Colophon:''' This page was generated by "  \
-                       + '[' + self._csv2wiki_url + ' csv2wiki]. '       \
-                       + 'Manual changes to this page might be '        \
-                       + 'overwritten by a subsequent run of csv2wiki.' \
-                       + '</span>'                                      \
-                       + '\n'
-        # The log message (edit message, commit message, whatever): the
-        # metadata you record in MediaWiki whenever you submit a change.
-        edit_msg = "Page generated by csv2wiki (" + self._csv2wiki_url + ")."
+        self._page_titles.add(page_title)
+        colophon = self._colophon
+        edit_msg = self._edit_msg
+
+        if isinstance(text, str):
+            text = [text]
 
         if self._dry_run_out is None:
-            page = self._site_conn.pages[page_title]
-            try:
-                page.save(text + colophon, edit_msg)
-
-                if self._make_non_editable:
-                    tokens = self._site_conn.get('query', meta='tokens')
-                    csrf_token = tokens['query']['tokens']['csrftoken']
-
-                    self._site_conn.api('protect',
-                            title=page_title,
-                            token=csrf_token,
-                            protections="edit=generated")
-            except mwclient.errors.APIError as e:
-                raise Exception("ERROR: unable to write page: '%s'" % e.info)
+            text = "".join(text) + colophon
+            if self._executor is not None:
+                self._pending_saves.append(
+                    self._executor.submit(self._write_page,
+                                          page_title, text, edit_msg,
+                                          created_msg))
+            else:
+                self._write_page(page_title, text, edit_msg, created_msg)
         else:
             # We don't include the edit_msg in dry-run output, 
-            # but we could. 
-            self._dry_run_out.write("~" * len(page_title) + "\n") # klugey
-            self._dry_run_out.write("%s\n" % page_title)
-            self._dry_run_out.write("~" * len(page_title) + "\n") # klugey
-            self._dry_run_out.write("\n")
-            self._dry_run_out.write("%s\n" % text + colophon)
-            # Again, klugey, but we want easy page-boundary visibility.
-            self._dry_run_out.write("\n" + "#" * 78 + "\n\n")
-
-    def _do_skel(self, skel, row):
+            # but we could.  The whole page goes out in one call,
+            # with its text streamed piece by piece.
+            rule = "~" * len(page_title) + "\n" # klugey
+            self._dry_run_out.writelines([rule, "%s\n" % page_title, rule, "\n"])
+            self._dry_run_out.writelines(text)
+            self._dry_run_out.writelines([
+                "\n",
+                colophon,
+                # Again, klugey, but we want easy page-boundary visibility.
+                "\n" + "#" * 78 + "\n\n",
+            ])
+            if created_msg is not None:
+                self._maybe_msg(created_msg)
+
+    @contextlib.contextmanager
+    def _parallel_saves(self):
+        """Context manager within which pages passed to _save_page() are
+        written to the wiki by a pool of self._jobs worker threads.
+
+        On exit, wait for every write to finish.  If any failed, raise
+        an exception listing all of the failures, not just the first,
+        so that one bad page doesn't hide the others.
+
+        With only one job, in a dry run (there's nothing to wait on),
+        or when already inside this context, pages are saved as usual."""
+        if (self._jobs <= 1 or self._dry_run_out is not None
+            or self._executor is not None):
+            yield
+            return
+
+        try:
+            with concurrent.futures.ThreadPoolExecutor(
+                    max_workers=self._jobs) as executor:
+                self._executor = executor
+                try:
+                    yield
+                finally:
+                    self._executor = None
+
+            failures = [str(future.exception()) for future in self._pending_saves
+                        if future.exception() is not None]
+        finally:
+            # Even if the body raised, these saves are over and done
+            # with; don't let a later context report on them.
+            self._pending_saves = []
+        if len(failures) > 0:
+            raise Exception("ERROR: %d page(s) could not be saved:\n" % len(failures)
+                            + "\n".join(failures))
+
+    def _thread_site(self):
+        """Return the mwclient Site for the current thread to use.
+
+        A Site isn't thread-safe (it caches edit tokens and the like),
+        so each save worker thread gets a Site of its own.  They all
+        share the main Site's requests.Session, so that they share its
+        connection pool (sized for the save jobs; see __init__) and its
+        login cookies, and a worker's Site is already logged in.
+
+        requests doesn't promise that a Session is thread-safe.  What
+        we rely on is narrower: the connection pool is urllib3's, which
+        is built to be used from many threads, and the cookie jar does
+        its own locking.  Nothing else in the Session (headers, auth,
+        adapters) is changed once the workers start."""
+        site = getattr(self._local, 'site', None)
+        if site is None:
+            mwclient = _require_mwclient()
+            (scheme, host) = self._wiki_url.split("://")
+            site = mwclient.Site(host, path=self._path_to_api, scheme=scheme,
+                                 pool=self._site_conn.connection)
+            self._local.site = site
+        return site
+
+    def _write_page(self, page_title, text, edit_msg, created_msg=None):
+        """Save TEXT as the content of page PAGE_TITLE in the wiki,
+        with EDIT_MSG as the edit summary, then pass CREATED_MSG (if
+        not None) to _maybe_msg().  This is the part of saving a page
+        that talks to the wiki, so it may run in a worker thread."""
+        mwclient = _require_mwclient()
+        site = self._thread_site()
+        page = site.pages[page_title]
+        try:
+            page.save(text, edit_msg)
+
+            if self._make_non_editable:
+                tokens = site.get('query', meta='tokens')
+                csrf_token = tokens['query']['tokens']['csrftoken']
+
+                site.api('protect',
+                        title=page_title,
+                        token=csrf_token,
+                        protections="edit=generated")
+        except mwclient.errors.APIError as e:
+            raise Exception("ERROR: unable to write page: '%s'" % e.info)
+        if created_msg is not None:
+            self._maybe_msg(created_msg)
+
+    def _render_section_headings(self):
+        """Set self._section_headings to the wiki heading line for each
+        section in self._section_structure.
+
+        Section titles only interpolate column headers, which are the
+        same for every row, so the headings are rendered once per
+        session rather than once per page."""
+        # The header list has None in slot 0, which str.format() would
+        # have rendered as "None", so stringify everything first.
+        header_strs = [str(h) for h in self._csv_input.headers]
+        self._section_headings = []
+        for skel in self._section_structure:
+            title = render_template(skel.title, skel._compiled_title,
+                                    header_strs)
+            self._section_headings.append(("=" * skel.level)
+                                          + " " + title
+                                          + " " + ("=" * skel.level))
+
+    def _do_skel(self, skel, heading, row):
         """Return the text for a given part of a wiki page.
         SKEL is a WikiSectionSkel.
+        HEADING is SKEL's heading line, from self._section_headings.
         ROW is one row (a list of cells) from the csv input.
         """
-        text = ""
+        # Accumulate pieces in a list and join them once at the end;
+        # repeated += on a string can copy the text over and over.
+        parts = []
+
+        for content_specifier, compiled, fast_col, cols in zip(
+                skel.content_specifiers, skel._compiled_content,
+                skel._fast_cols, skel._content_cols):
+            if fast_col is not None:
+                cell = row[fast_col]
+                if cell == "":
+                    continue
+                parts.append("\n")
+                parts.append(cell)
+                parts.append("\n")
+            elif cols is not None and not any(row[col] for col in cols):
+                # Every cell this refers to is empty, so leave it out
+                # (without bothering to render it); if that leaves the
+                # section with no text, the self._keep_empty handling
+                # below applies.
+                continue
+            else:
+                parts.append("\n")
+                parts.append(render_template(content_specifier, compiled, row))
+                parts.append("\n")
 
-        for content_specifier in skel.content_specifiers:
-            text += "\n"
-            text += content_specifier.format(*row)
-            text += "\n"
+        text = "".join(parts)
 
         if text == "":
             if len(skel.content_specifiers) == 0:
@@ -874,10 +1266,7 @@ class WikiSession:
             else:
                 text = "\n" + self._keep_empty + "\n"
 
-        return ("=" * skel.level)                                  \
-            + " " + (skel.title.format(*self._csv_input.headers))  \
-            + " " + ("=" * skel.level)                             \
-            + text
+        return heading + text
 
     def _wikiize_cell(self, cell):
         """Update a CELL to be ready for the wiki.
@@ -891,19 +1280,58 @@ class WikiSession:
 
         if cell.lower() == "null" and not self._null_as_value:
             cell = ""
-        elif cell != "":
+        elif _is_plain_text(cell):
+            # Most cells are plain text, so don't bother parsing them.
+            pass
+        else:
             # Mediawiki doesn't do tbody
-            cell = cell.replace("<tbody>", "").replace("</tbody>", "")
+            if "tbody>" in cell:
+                cell = cell.replace("<tbody>", "").replace("</tbody>", "")
+            # Cells whose only markup is simple links can be wikified
+            # by plain substitution, without any parsing -- unless some
+            # text around or inside the links is all whitespace, which
+            # BeautifulSoup would collapse.  (split() gives the text
+            # outside the links, then each link's quote, href, and
+            # text, and so on.)
+            if "<a" in cell or "<A" in cell:
+                pieces = _SIMPLE_ANCHOR_RE.split(cell)
+                if not any(text != "" and text.strip(_SOUP_SPACES) == ""
+                           for text in pieces[0::4] + pieces[3::4]):
+                    wikified = _SIMPLE_ANCHOR_RE.sub(r"[\2 \3]", cell)
+                    if "<" not in wikified and ">" not in wikified \
+                       and "&" not in wikified:
+                        return wikified
             # Make soup
-            warnings.filterwarnings(
-                "ignore", category=UserWarning, module='bs4')
-            soup = BeautifulSoup(cell, "html.parser")
+            soup = _require_bs4().BeautifulSoup(cell, "html.parser")
             soup = wikify_anchors(soup)
 
             cell = str(soup)
 
         return cell
 
+    def _wikiize_row(self, row):
+        """Return a copy of ROW with its cells made ready for the wiki,
+        as by _wikiize_cell().
+
+        Only the columns that self._section_structure (or the
+        category column) actually uses get wikiized, since that
+        can mean a full HTML parse per cell; the other cells are
+        never emitted, so they're just carried along as they are."""
+        cols = self._wikiized_cols
+        if cols is None:
+            cols = range(len(row))
+        wikiized_row = list(row)
+        wikiize_cell = self._wikiize_cell
+        for col in cols:
+            cell = row[col]
+            # This is called for every cell of every row, and most
+            # cells are plain text that _wikiize_cell() would return
+            # unchanged, so spot those here and skip the method call.
+            # (Any cell that could be "null" has length 4.)
+            if len(cell) == 4 or not _is_plain_text(cell):
+                wikiized_row[col] = wikiize_cell(cell)
+        return wikiized_row
+
     def _update_category_cell(self, cell, page_title):
         """Update a CELL to link to the category.
 
@@ -912,13 +1340,24 @@ class WikiSession:
         not check if CELL should be the category, and counts on the
         caller to ensure that it is the correct column."""
 
-        cell_esc = self._wiki_escape_page_title(massage_string(cell))
+        # Many rows share each category.  massage_string() has its
+        # own (bounded) cache, so a value is only transliterated once;
+        # but escaping the result still costs an encode and a copy or
+        # two per row, which adds up over a big CSV, so the escaped
+        # name is kept too.  That's one entry per distinct category,
+        # the same as self._categories holds anyway, so it can't grow
+        # the way a cache of arbitrary cells could.  The name is also
+        # interned, so the self._categories keys and lookups share one
+        # string.
+        name = massage_string(cell)
+        cell_esc = self._cat_esc_cache.get(name)
+        if cell_esc is None:
+            cell_esc = sys.intern(self._wiki_escape_page_title(name))
+            self._cat_esc_cache[name] = cell_esc
         cell = '[[:Category:' + cell_esc + '|' + cell_esc + ']]\n'
         cell += '[[Category:' + cell_esc + ']]'
-        if self._categories.get(cell_esc) is None:
-            self._categories[cell_esc] = [page_title]
-        else:
-            self._categories[cell_esc].append(page_title)
+        self._categories.setdefault(cell_esc, []).append(page_title)
+        self._total_categorized += 1
 
         return cell
 
@@ -942,7 +1381,8 @@ class WikiSession:
         and the TOC can be generated.
         """
         # Splice any requested columns into the page name.
-        page_title = self._title_tmpl.format(*row)
+        page_title = render_template(self._title_tmpl,
+                                     self._compiled_title_tmpl, row)
         # The input is UTF-8, but for wiki page names we
         # want to stick to plain old lower ASCII.
         page_title = massage_string(page_title)
@@ -953,19 +1393,16 @@ class WikiSession:
         # ampersand-encoded special char and then complains
         # about an invalid page title.  We put underscores
         # fore and aft to break up that second special char.
-        if re.search(r"&amp;.*;", page_title):
+        if "&amp;" in page_title and _AMP_RE.search(page_title):
             page_title = page_title.replace("&amp;", "_&amp;_")
             page_title = page_title.replace("&amp;__", "&amp;_")
             page_title = page_title.replace("__&amp;", "_&amp;")
         
         # How many pages have been categorized so far?
-        cats_count = sum(len(val) for val in self._categories.values())
+        cats_count = self._total_categorized
 
-        # We wikiize the whole row once so sections can reuse
-        #
-        # We preprocess the whole row unconditionally, without knowing
-        # which columns self._section_structure will actually use.
-        wikiized_row = [self._wikiize_cell(cell) for cell in row]
+        # We wikiize the row once so sections can reuse it.
+        wikiized_row = self._wikiize_row(row)
 
         # We categorize the column if the _cat_col is set at all,
         # regardless of whether the column is actually use in the sec_map
@@ -991,11 +1428,9 @@ class WikiSession:
         # If the number of categorized pages didn't change, then
         # this row (page) didn't fall into any named category, so put
         # it in the magical category whose name is the empty string.
-        if cats_count == sum(len(val) for val in self._categories.values()):
-            if self._categories.get("") is None:
-                self._categories[""] = [page_title]
-            else:
-                self._categories[""].append(page_title)
+        if cats_count == self._total_categorized:
+            self._categories.setdefault("", []).append(page_title)
+            self._total_categorized += 1
 
         return (page_title, wikiized_row)
 
@@ -1004,13 +1439,13 @@ class WikiSession:
 
         Actually creates the wiki text, and then saves the page."""
         # Crawl down the page skel, appending page content as needed.
-        page_text = ""
-
-        for skel in self._section_structure:
-            page_text += self._do_skel(skel, wikiized_row)
+        # _save_page() takes the pieces as they are.
+        page_text = [self._do_skel(skel, heading, wikiized_row)
+                     for skel, heading in zip(self._section_structure,
+                                              self._section_headings)]
 
-        self._save_page(page_title, page_text)
-        self._maybe_msg(("CREATED PAGE: \"" + page_title + "\"\n"))
+        self._save_page(page_title, page_text,
+                        "CREATED PAGE: \"" + page_title + "\"\n")
 
     def _save_category_page(self, category):
         """Add a category page for CATEGORY to the wiki.
@@ -1022,13 +1457,14 @@ class WikiSession:
         on the MediaWiki instance.  See the csv2wiki help
         output for more about this."""
 
-        self._save_page('Category:' + category, "")
-        self._maybe_msg(("CREATED CATEGORY: \"" + category + "\"\n"))
+        self._save_page('Category:' + category, "",
+                        "CREATED CATEGORY: \"" + category + "\"\n")
 
     def make_categories(self, categories):
         """Create pages for categories CATEGORIES."""
-        for category in categories:
-            self._save_category_page(category)
+        with self._parallel_saves():
+            for category in categories:
+                self._save_category_page(category)
 
     def add_helper_pages(self, helper_pages):
         """Create pages for HELPER_PAGES.
@@ -1042,8 +1478,8 @@ class WikiSession:
             with open(helper_page) as f:
                 file_contents = f.readlines()
             page_title = self._wiki_escape_page_title(file_contents[0].strip())
-            self._save_page(page_title, "\n".join(file_contents[1:]))
-            self._maybe_msg(("CREATED PAGE: \"" + page_title + "\"\n"))
+            self._save_page(page_title, "\n".join(file_contents[1:]),
+                            "CREATED PAGE: \"" + page_title + "\"\n")
 
     def make_pages(self, pare, cat_sort="size"):
         """Create a wiki page for each row in the csv.
@@ -1057,6 +1493,8 @@ class WikiSession:
         documentation for the '--cat-sort' option for details.
         """
 
+        self._render_section_headings()
+
         # read in csv
         row_num = 0
 
@@ -1072,19 +1510,19 @@ class WikiSession:
             # the config file, and so that all the remaining columns
             # use 1-based indexing, which matches how the user refers
             # to columns in the config file.
-            row_num_str = self._row_num_fmt.format(row_num)
+            row_num_str = self._row_num_fmt % row_num
             processed_rows.append(self._process_row([row_num_str] + row))
 
-        # create the TOC page.
-        toc_text = ""
+        # create the TOC page, accumulating its text in a list
+        toc_parts = []
 
         # Remember, there's a magical category whose name is "".
         # Even if we have no other categories, we have that one.
-        num_categories = len(list(self._categories.keys()))
+        num_categories = len(self._categories)
     
         # This got too big to fit into a lambda anymore :-).
         def categories_sorter(key):
-            """Return a descending sort value for category KEY.
+            """Return a sort key (a tuple) for category KEY.
             Works whether ambient cat_sort value is "size" or "alpha".
 
             If "size", then categories will still be sorted
@@ -1097,21 +1535,15 @@ class WikiSession:
             If "alpha", then sort strictly alphabetically, both among
             and within categories.
             """
-            # Look, laugh if you want, but it works.
-            fmt = "{:015}"
-            bounce = 9999999999999
-            if (self._last_cat is not None
-                and key.strip().lower() == self._last_cat):
-                if cat_sort == "size":
-                    return fmt.format(bounce)
-                else:
-                    # This works too.  Stop laughing.
-                    return "zzzzzzzzzzzzzzzzzzzzzzzzzzzzzzzzzzzzzzzzz"
-            elif cat_sort == "size":
-                num = bounce - len(self._categories[key])
-                return fmt.format(num) + key.strip().lower()
+            # Tuples compare element by element, so the first element
+            # puts the last_cat category after all the others, and in
+            # "size" mode the (negated) size puts bigger categories first.
+            name = key.strip().lower()
+            is_last = self._last_cat is not None and name == self._last_cat
+            if cat_sort == "size":
+                return (is_last, -cat_sizes[key], name)
             else:
-                return key.strip().lower()
+                return (is_last, name)
 
         if ((num_categories > 1) and (self._categories.get("") is not None)):
             if self._default_cat is not None:
@@ -1145,20 +1577,25 @@ class WikiSession:
             self.make_categories(self._categories.keys())
 
         # then actutally save pages for the rows
-        for wikiized_row in processed_rows:
-            self._make_page(*wikiized_row)
+        with self._parallel_saves():
+            for wikiized_row in processed_rows:
+                self._make_page(*wikiized_row)
     
         # and lastly, the toc
-        for cat in sorted(list(self._categories.keys()), key=categories_sorter):
+        #
+        # The sorter needs each category's size on every call, so
+        # look them all up once beforehand.
+        cat_sizes = {cat: len(pages) for cat, pages in self._categories.items()}
+        for cat in sorted(self._categories, key=categories_sorter):
             if num_categories > 1:
-                usable_cat = cat + " (" + str(len(self._categories[cat])) + ")"
-                toc_text += "==== " + usable_cat + " ====\n\n"
+                usable_cat = cat + " (" + str(cat_sizes[cat]) + ")"
+                toc_parts.append("==== " + usable_cat + " ====\n\n")
             for pnam in sorted(self._categories[cat]):
-                toc_text += '* [[' + pnam + ']]\n'
-            toc_text += "\n"
+                toc_parts.append('* [[' + pnam + ']]\n')
+            toc_parts.append("\n")
         if self._toc_name is not None:
-            self._save_page(self._toc_name, toc_text)
-            self._maybe_msg(("CREATED TOC: \"" + self._toc_name + "\"\n"))
+            self._save_page(self._toc_name, toc_parts,
+                            "CREATED TOC: \"" + self._toc_name + "\"\n")
 
     def upload_attachments(self, attachments):
         """
@@ -1174,6 +1611,7 @@ class WikiSession:
                 continue
 
             if self._dry_run_out is None:
+                mwclient = _require_mwclient()
                 self._maybe_msg("UPLOADED ATTACHMENT: " + str(attachment) + "\n")
                 try:
                     fh = open(attachment[1], 'rb')
@@ -1188,42 +1626,120 @@ class WikiSession:
 
 class CSVInput():
     """Iterator class encapsulating a CSV file as input."""
-    def _count_rows(self):
-        """Count rows in the csv file, accounting for the headers"""
-        
-        self._csv_fh.seek(0)
-        row_count = sum(1 for row in self._csv_reader) - 1
-        
-        # Reset the reader for our callers.
-        self._csv_fh.seek(0)
-        self._csv_reader = csv.reader(self._csv_fh,
-                            delimiter=self._config.get('delimiter', ','),
-                            quotechar=self._config.get('quotechar', '"'))
-        
-        return row_count
-    
+    def _read_native(self, csv_path):
+        """Return all rows of the CSV file at CSV_PATH (header included)
+        as a list of lists of strings, using pyarrow's native parser.
+        The rows are the same as the csv module would give us.
+
+        Return None if pyarrow isn't installed, or if the file is one
+        whose rows pyarrow would read differently (e.g., because rows
+        have differing numbers of cells), in which case the caller
+        should fall back to the csv module."""
+        # Optional: pyarrow's native CSV parser is much faster than
+        # Python's csv module on big files, but it's slow to import,
+        # so only do that when we actually have a file to read.
+        pacsv = _optional_module("pyarrow.csv")
+        if pacsv is None:
+            return None
+        pyarrow = _optional_module("pyarrow")
+        pacompute = _optional_module("pyarrow.compute")
+
+        delimiter = self._config.get('delimiter', ',')
+        quotechar = self._config.get('quotechar', '"')
+
+        # pyarrow infers column types unless told otherwise, which
+        # would turn a cell like "007" into the integer 7.  To make
+        # every column a string column we need to know how many
+        # columns there are, so peek at the header row first.
+        with open(csv_path, newline='', encoding="utf-8") as fh:
+            num_cols = len(next(csv.reader(fh, delimiter=delimiter,
+                                           quotechar=quotechar), []))
+        if num_cols == 0:
+            return None
+
+        # pyarrow strips a leading UTF-8 byte order mark, which the
+        # csv module keeps as part of the first header.  And where
+        # the csv module gives an empty row for a blank line, pyarrow
+        # either skips it or gives a row of empty cells.  Both are
+        # rare, so leave such files to the csv module.  A blank line
+        # is two line breaks in a row (other than "\r\n" itself);
+        # this also catches some inside quoted cells, which is fine.
+        with open(csv_path, "rb") as fh:
+            data = fh.read()
+        if (data.startswith(codecs.BOM_UTF8)
+            or data[:1] in (b"\r", b"\n")
+            or b"\n\n" in data or b"\n\r" in data or b"\r\r" in data):
+            return None
+
+        # With autogenerated column names, the header row comes back
+        # as an ordinary row of data, which is just what we want.
+        column_types = {"f%d" % i: pyarrow.string() for i in range(num_cols)}
+        try:
+            table = pacsv.read_csv(
+                pyarrow.BufferReader(data),
+                read_options=pacsv.ReadOptions(
+                    block_size=8 << 20,
+                    autogenerate_column_names=True),
+                parse_options=pacsv.ParseOptions(
+                    delimiter=delimiter,
+                    quote_char=quotechar,
+                    newlines_in_values=True),
+                convert_options=pacsv.ConvertOptions(
+                    column_types=column_types))
+        except pyarrow.ArrowInvalid:
+            return None
+
+        # We read with universal newlines for the csv module, so a
+        # line break inside a quoted cell comes back as "\n" whether
+        # it was "\r\n", "\r" or "\n" in the file.  pyarrow leaves
+        # them as they were, so translate them the same way.  Then
+        # convert each column to Python strings in one go, and
+        # transpose back into rows for our callers.
+        columns = []
+        for column in table.columns:
+            column = pacompute.replace_substring(column, "\r\n", "\n")
+            column = pacompute.replace_substring(column, "\r", "\n")
+            columns.append(column.to_pylist())
+        return [list(row) for row in zip(*columns)]
+
     def __init__(self, csv_input, config, skip_rows=0):
         """Prepare CSV_FILE for input, with delimiters from CONFIG.
         CONFIG is a dict returned from parse_config_file(), or else
         it is None, in which case default config values are used.
 
         SKIP_ROWS is the number of lines to skip after the header."""
-        self._csv_reader          = None  # will be csv.reader object
+        self._csv_reader          = None  # will be an iterator over rows
         self.headers             = []     # note: will use 1-based indexing
         self.row_count           = None  # will be num rows not counting header
         
         self._config = config or {}
-        try:
-            self._csv_fh = open(csv_input)
-        except TypeError:
-            # EAFP for when a stream is coming in rather than a filename
-            self._csv_fh = csv_input
-        self._csv_reader = csv.reader(self._csv_fh,
-                            delimiter=self._config.get('delimiter', ','),
-                            quotechar=self._config.get('quotechar', '"'))       
+        rows = None
+        if isinstance(csv_input, str):
+            rows = self._read_native(csv_input)
 
-        # First get a row count, so we can pad the row number later.
-        self.row_count = self._count_rows()
+        if rows is None:
+            try:
+                # Read and decode the whole file in one go, which is
+                # much cheaper than decoding it line by line in text
+                # mode.  Universal newline handling is kept by the
+                # StringIO below.
+                with open(csv_input, "rb") as fh:
+                    csv_fh = io.StringIO(fh.read().decode("utf-8"), newline=None)
+            except TypeError:
+                # EAFP for when a stream is coming in rather than a filename
+                csv_fh = csv_input
+            # Parse everything in a single pass and keep the rows.  We
+            # need the row count up front (to pad row numbers), and
+            # make_pages() holds every row in memory anyway, so this
+            # way the CSV is parsed only once -- and input streams that
+            # can't seek back to the start, such as pipes, work too.
+            rows = list(csv.reader(csv_fh,
+                                   delimiter=self._config.get('delimiter', ','),
+                                   quotechar=self._config.get('quotechar', '"')))
+
+        # The row count doesn't include the header.
+        self.row_count = len(rows) - 1
+        self._csv_reader = iter(rows)
 
         # Set column headers, using 1-based indexing.
         self.headers = [None,] + next(self._csv_reader)
@@ -1254,6 +1770,7 @@ def wikify_anchors(soup):
     soup?
 
     """
+    BeautifulSoup = _require_bs4().BeautifulSoup
     for a in soup.select('a'):
         if 'href' in str(a):
             a.replace_with(
@@ -1342,6 +1859,7 @@ def main():
                                     "attachments=",
                                     "helper-page=",
                                     "pare=",
+                                    "jobs=",
                                     "config=",
                                     "skip-rows=",
                                     "show-columns"])
@@ -1364,6 +1882,7 @@ def main():
     helper_pages = []
     cat_sort = "size"
     pare = None
+    jobs = 1
     skip_rows = 0
     show_columns = False
     for o, a in opts:
@@ -1395,6 +1914,12 @@ def main():
                 attachments = [ l.strip().split("|", 1) for l in f.readlines() ]
         elif o in ("--pare",):
             pare = int(a)
+        elif o in ("--jobs",):
+            jobs = int(a)
+            if jobs < 1:
+                sys.stderr.write('ERROR: "--jobs" option takes a positive number\n')
+                usage(errout=True)
+                sys.exit(2)
         elif o in ("--skip-rows",):
             skip_rows = int(a)
         elif o in ("--show-columns",):
@@ -1439,7 +1964,8 @@ def main():
             csv_in.show_columns(sys.stdout)
             sys.exit(0)
 
-    wiki_sess = WikiSession(config, csv_in, null_as_value, msg_out, dry_run_out, make_non_editable)
+    wiki_sess = WikiSession(config, csv_in, null_as_value, msg_out, dry_run_out, make_non_editable,
+                            jobs)
 
     try:
         # We make extra category pages and helper pages  first so that they
@@ -28,18 +28,26 @@ sanitized_fname = ".../path/to/original_input.csv"
 import os
 import re
 
-# We named csv2wiki without the .py extension, so these next lines
-# are basically just a regular old import:
-import imp
-if os.path.isdir('csv2wiki'):
-    csv2wiki = imp.load_source('csv2wiki', 'csv2wiki/csv2wiki')
-else:
-    csv2wiki = imp.load_source('csv2wiki', 'csv2wiki')
+# csv2wiki is a package sitting next to this file, so make sure that
+# directory is on the path and import it the regular way.  (We used to
+# use imp.load_source() here, which recompiled the whole thing on every
+# run and is gone as of Python 3.12; a normal import uses __pycache__.)
+import importlib
+import sys
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+csv2wiki = importlib.import_module('csv2wiki')
 
 from bs4 import BeautifulSoup
+import concurrent.futures
 import contextlib
+import functools
+import importlib.util
 import os
-import urllib.request, urllib.error, urllib.parse
+import requests
+
+# lxml parses much faster than Python's own html.parser, so use it for
+# the wiki's pages if it's installed (pip3 install lxml).
+soup_parser = "lxml" if importlib.util.find_spec("lxml") else "html.parser"
 
 # Change working directory context manager
 @contextlib.contextmanager
@@ -49,17 +57,26 @@ def cwd(direc):
     try: yield
     finally: os.chdir(curdir)
 
-## Load config file
+## Load config file, once; everything below uses this copy.
 with cwd(os.path.dirname(os.path.abspath(__file__))):
     config = csv2wiki.parse_config_file(config_fname)
 
+# One HTTP session for every fetch, so connections to the wiki are
+# kept alive and reused (including by test_entries' fetch threads)
+# instead of paying a new TCP/TLS handshake per page.
+session = requests.Session()
+session.mount("http://", requests.adapters.HTTPAdapter(pool_maxsize=32))
+session.mount("https://", requests.adapters.HTTPAdapter(pool_maxsize=32))
+
 mediawiki_url = ""
 def get_mediawiki_url():
     # Get wiki access url
     global mediawiki_url
     if not mediawiki_url:
-        req = urllib.request.urlopen(config['wiki_url'])
-        mediawiki_url = '/'.join(req.geturl().split('/')[:-1]) + '/'
+        # We only want the URL we end up at after redirects, not the
+        # page itself.
+        req = session.head(config['wiki_url'], allow_redirects=True)
+        mediawiki_url = '/'.join(req.url.split('/')[:-1]) + '/'
     return mediawiki_url
 
 created = False
@@ -70,35 +87,36 @@ def create_pages():
         null_as_value = False
         pare = 1
         with cwd(os.path.dirname(os.path.abspath(__file__))):
-            config = csv2wiki.parse_config_file(config_fname)
             csv_in = csv2wiki.CSVInput(sanitized_fname, config)
         wiki_sess = csv2wiki.WikiSession(config)
         csv2wiki.create_pages(wiki_sess, csv_in, null_as_value, pare)
     created = True
 
+@functools.lru_cache(maxsize=512)
 def fetch_page(name):
     """Pull page named NAME from our mediawiki instance and return it as a
-string"""
+string.  The wiki doesn't change during a test run, so each page is only
+fetched once."""
     create_pages()
-    return urllib.request.urlopen(get_mediawiki_url() + name).read().decode("utf-8")
+    req = session.get(get_mediawiki_url() + name)
+    req.raise_for_status()
+    return req.content.decode("utf-8")
 
 def fetch_entry(num):
     """Given an entry number, fetch it from the mediawiki"""
-    toc = BeautifulSoup(fetch_page('Test_TOC'), "html.parser")
+    toc = BeautifulSoup(fetch_page('Test_TOC'), soup_parser)
     toc.select("<li>")
 
 toc = None
 def fetch_toc_soup():
     global toc
-    if not toc:
-        return BeautifulSoup(fetch_page('Test_TOC'), "html.parser")
+    if toc is None:
+        toc = BeautifulSoup(fetch_page('Test_TOC'), soup_parser)
     return toc
 
 def test_config_file():
     """Make sure the config file is there and we find an expected field."""
-    with cwd(os.path.dirname(os.path.abspath(__file__))):
-        config = csv2wiki.parse_config_file(config_fname)
-        assert config['wiki_url'] != ""
+    assert config['wiki_url'] != ""
     
 def test_toc():
     """Make sure there is a table of contents."""
@@ -123,7 +141,7 @@ def test_entries():
 
     assert len(entries) > 0
 
-    fetched_one = False
+    urls = []
     for e in entries:
         href = e.get('href', "")
         if not href:
@@ -132,7 +150,15 @@ def test_entries():
             continue
         url = "Entry"+href.split("/Entry")[1]
         print("Trying to fetch " + url)
-        html = fetch_page(url)
+        urls.append(url)
+
+    # Fetch the entries concurrently; each one is mostly waiting on
+    # the wiki.  (The pages themselves were already created above.)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=20) as executor:
+        pages = list(executor.map(fetch_page, urls))
+
+    fetched_one = False
+    for html in pages:
         assert html != ""
 
         # test wikify_anchors
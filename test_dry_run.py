@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Offline tests for csv2wiki, using dry runs.
+#
+# Copyright (C) 2017, 2018 Open Tech Strategies, LLC
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+__doc__ = """These tests check the wiki text csv2wiki generates, by doing
+dry runs.  Unlike test_csv2wiki.py, they don't need a mediawiki instance.
+"""
+
+from bs4 import BeautifulSoup
+import contextlib
+import importlib
+import io
+import os
+import pytest
+import sys
+import tempfile
+
+# See test_csv2wiki.py.
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+csv2wiki = importlib.import_module('csv2wiki')
+
+config_string = """[default]
+wiki_url: http://localhost/mediawiki
+username: nobody
+password: nothing
+title_tmpl: Entry {1}
+omit_colophon: yes
+sec_map:  .   Name
+          | {2}
+          .   Notes
+          | Random: {3}
+"""
+
+csv_string = """Id,Name,Notes
+1,Alice,Likes cats
+2,Bob,
+"""
+
+def dry_run(extra_config="", csv_text=csv_string):
+    """Do a dry run over CSV_TEXT using config_string, plus the lines
+    in EXTRA_CONFIG, and return a dict mapping each page title to that
+    page's wiki text."""
+    config = csv2wiki.parse_config_string(config_string + extra_config)
+    csv_in = csv2wiki.CSVInput(io.StringIO(csv_text), config)
+    out = io.StringIO()
+    wiki_sess = csv2wiki.WikiSession(config, csv_in, False, None, out, False)
+    wiki_sess.make_pages(None)
+
+    # Each page is its title between two rules of "~", then its text,
+    # then a rule of "#".
+    pages = {}
+    for chunk in out.getvalue().split("#" * 78 + "\n\n"):
+        lines = chunk.split("\n")
+        if len(lines) > 3 and lines[0].startswith("~"):
+            pages[lines[1]] = "\n".join(lines[3:])
+    return pages
+
+def test_empty_section_omitted():
+    """A section whose cells are all empty is left out by default,
+    literal text and all."""
+    pages = dry_run()
+    assert "= Notes =" in pages["Entry 1"]
+    assert "Random: Likes cats" in pages["Entry 1"]
+    assert "= Notes =" not in pages["Entry 2"]
+    assert "Random:" not in pages["Entry 2"]
+    assert "= Name =" in pages["Entry 2"]
+
+def test_empty_section_kept():
+    """With keep_empty, a section whose cells are all empty is kept,
+    with the keep_empty value as its content."""
+    pages = dry_run("keep_empty: Nothing here\n")
+    assert "Random: Likes cats" in pages["Entry 1"]
+    assert "= Notes =\nNothing here\n" in pages["Entry 2"]
+    assert "Random:" not in pages["Entry 2"]
+
+def test_whitespace_cells():
+    """A cell that is nothing but whitespace comes out the way
+    BeautifulSoup leaves it: as one space, or as one newline if it
+    had any."""
+    pages = dry_run(csv_text='Id,Name,Notes\n1,"  ",x\n2,"\r\n",y\n')
+    assert "= Name =\n \n" in pages["Entry 1"]
+    assert "= Name =\n\n\n" in pages["Entry 2"]
+
+@contextlib.contextmanager
+def csv_file(data):
+    """Context manager: write bytes DATA to a temporary CSV file and
+    yield its path."""
+    fd, path = tempfile.mkstemp(suffix=".csv")
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            fh.write(data)
+        yield path
+    finally:
+        os.remove(path)
+
+def read_both_ways(data):
+    """Read bytes DATA as a CSV file, once as usual (with pyarrow, if
+    CSVInput chooses to) and once with only the csv module.  Return
+    (headers, row_count, rows) for each, plus whether pyarrow read it."""
+    results = []
+    with csv_file(data) as path:
+        csv_in = csv2wiki.CSVInput(path, None)
+        results.append((csv_in.headers, csv_in.row_count, list(csv_in)))
+        used_pyarrow = csv_in._read_native(path) is not None
+
+        saved = csv2wiki.non_core_modules.get("pyarrow.csv")
+        csv2wiki.non_core_modules["pyarrow.csv"] = None
+        try:
+            csv_in = csv2wiki.CSVInput(path, None)
+        finally:
+            csv2wiki.non_core_modules["pyarrow.csv"] = saved
+        results.append((csv_in.headers, csv_in.row_count, list(csv_in)))
+    return results[0], results[1], used_pyarrow
+
+@pytest.mark.parametrize("data, pyarrow_reads_it", [
+    # Line breaks inside quoted cells come out as "\n" either way.
+    (b'A,B\r\n"x\r\ny",1\r\n"x\ry",2\r\n"x\ny",3\r\n', True),
+    (b'A,B\n"x\r\ny",1\n', True),
+    (b'A,B\r"x\r\ny",1\r', True),
+    # Cells pyarrow might otherwise take for numbers, or nulls.
+    (b'A,B\n007,\n,NA\n', True),
+    # The csv module keeps a byte order mark; pyarrow would strip it.
+    (b'\xef\xbb\xbfA,B\n1,2\n', False),
+    # Blank lines are empty rows to the csv module.
+    (b'A,B\n1,2\n\n3,4\n', False),
+    (b'A,B\r\n1,2\r\n\r\n', False),
+    (b'A\n1\n\n2\n', False),
+    # Rows with differing numbers of cells.
+    (b'A,B\n1,2,3\n4\n', False),
+])
+def test_native_csv_matches_csv_module(data, pyarrow_reads_it):
+    """CSVInput gives the same headers, row count and rows whether
+    pyarrow's reader is used or not."""
+    pytest.importorskip("pyarrow.csv")
+    usual, csv_module, used_pyarrow = read_both_ways(data)
+    assert usual == csv_module
+    assert used_pyarrow == pyarrow_reads_it
+
+def soup_wikiize(cell):
+    """Return CELL as wikiized the long way, by BeautifulSoup and
+    wikify_anchors(), for comparison with WikiSession._wikiize_cell()."""
+    return str(csv2wiki.wikify_anchors(BeautifulSoup(cell, "html.parser")))
+
+@pytest.mark.parametrize("cell", [
+    '<a href="u">t</a>',
+    '<a href="u">t</a>\r\n',
+    '<a href="u">t</a>\r',
+    '<a href="u">  </a>',
+    '<a href="u">\r\n</a>',
+    '<a href="u"> t </a> and <a href=\'v\'>w</a>',
+    '\n<a href="u">t</a> ',
+    '<A HREF="u">t</A>',
+    '<A\thref="u" >t</a>',
+    '<b>bold</b> <a href="u">t</a>',
+    '<a href="u" title="x">t</a>',
+    '<a href="u"><i>t</i></a>',
+    '<a href="u?a=1&amp;b=2">t</a>',
+])
+def test_link_cells(cell):
+    """Links come out as they would from BeautifulSoup, whether or not
+    _wikiize_cell() takes its shortcut for them."""
+    config = csv2wiki.parse_config_string(config_string)
+    wiki_sess = csv2wiki.WikiSession(config, None, False, None,
+                                     io.StringIO(), False)
+    assert wiki_sess._wikiize_cell(cell) == soup_wikiize(cell)
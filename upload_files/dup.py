@@ -14,24 +14,63 @@ export that gave us the files.  Or perhaps in how the application was filled
 out.  We don't want to publish what we think is a Team Structure document and
 have it actually be financial data.
 
-This script just goes through the md5sums and prints entries that have the same
-hash and also the same review number.  It expects to find a sorted file of
-md5sums and files:
+This script hashes the files and prints entries that have the same hash and
+also the same review number.  Point it at the directory of files:
+
+    ./dup.py ../100andchange_export\ 2 > dupes
+
+Or, with no argument, it reads a file of md5sums and files (it doesn't need to
+be sorted), as it always has:
 
     md5sum ../100andchange_export\ 2/* > checklist.chk
-    sort checklist.chk -i checklist.chk
     ./dup.py > dupes
 
 """
-with open("checklist.chk") as fh:
-    lines = fh.read().split("\n")
-
-last = ('','__')
-for line in lines:
-    if not line:
-        continue
-    chksum, fname = line.split(" ",1)
-    undef, undef, fname = fname.split('/')
-    if chksum == last[0] and fname.split('__',1)[0] == last[1].split('__',1)[0]:
-        print("%s = %s" % (last[1], fname))
-    last = (chksum, fname)
+import collections
+import concurrent.futures
+import hashlib
+import os
+import sys
+
+def file_sha1(path):
+    """Return the SHA-1 hex digest of the contents of the file at PATH"""
+    sha1 = hashlib.sha1()
+    with open(path, 'rb') as fh:
+        for block in iter(lambda: fh.read(1024 * 1024), b''):
+            sha1.update(block)
+    return sha1.hexdigest()
+
+def hash_directory(dirname):
+    """Return a list of (hash, fname) for each file in DIRNAME.  Files are
+    hashed by a pool of threads; hashlib releases the GIL while it
+    hashes, so the threads overlap both reading and hashing."""
+    fnames = sorted(entry.name for entry in os.scandir(dirname) if entry.is_file())
+    paths = [os.path.join(dirname, fname) for fname in fnames]
+    with concurrent.futures.ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+        return list(zip(executor.map(file_sha1, paths), fnames))
+
+def read_checklist(checklist_fname):
+    """Return a list of (hash, fname) from CHECKLIST_FNAME, md5sum output"""
+    hashes = []
+    with open(checklist_fname) as fh:
+        for line in fh:
+            line = line.rstrip("\n")
+            if not line:
+                continue
+            chksum, fname = line.split(None, 1)
+            hashes.append((chksum, fname.rsplit('/', 1)[-1]))
+    return hashes
+
+if len(sys.argv) > 1:
+    hashes = hash_directory(sys.argv[1])
+else:
+    hashes = read_checklist("checklist.chk")
+
+# Group the files by (hash, review number), in one pass.
+groups = collections.defaultdict(list)
+for chksum, fname in hashes:
+    groups[(chksum, fname.split('__', 1)[0])].append(fname)
+
+for fnames in groups.values():
+    for first, second in zip(fnames, fnames[1:]):
+        sys.stdout.write("%s = %s\n" % (first, second))
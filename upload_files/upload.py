@@ -9,16 +9,36 @@ and affiliates them with pages, then uploads them and links to them
 from pages.
 """
 
+import concurrent.futures
+import hashlib
 import json
 import mwclient
 import os
 import re
 import requests
 import sys
+import threading
 import time
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 import config as c
 
+# An entry line in the table of contents page: "* [[Page title]]"
+TOC_ENTRY_RE = re.compile(r"^\* \[\[.*$", re.MULTILINE)
+
+# Upload threads print progress; this keeps their lines from mixing.
+print_lock = threading.Lock()
+
+def say(*args):
+    """Print ARGS, like print(), but safely from any thread"""
+    with print_lock:
+        print(*args)
+
+def wiki_fname(idnum, tag, fname):
+    """Return the name on the wiki for local file FNAME, the TAG file for IDNUM"""
+    return "%s_%s%s" % (idnum, tag, os.path.splitext(fname)[1])
+
 def slurp(fname):
     """Read file and return contents"""
     if not os.path.exists(fname):
@@ -27,7 +47,7 @@ def slurp(fname):
         return fh.read()
 
 class Session():
-    def __init__(self, domain, username, pword, datadir, tags):
+    def __init__(self, domain, username, pword, datadir, tags, jobs=8):
         """DATADIR is a path to a directory fill of files to consider uploading
 
         DOMAIN is the url of the wiki server
@@ -36,110 +56,249 @@ class Session():
 
         PWORD is that USERNAME's password
 
-        TAGS are the tags that we're going to care about.  It should be a subset of the tags in c.tags"""
+        TAGS are the tags that we're going to care about.  It should be a subset of the tags in c.tags
+
+        JOBS is how many files to upload at once"""
         self.domain = domain
+        self.username = username
+        self.pword = pword
+        self.local = threading.local()      # per-thread mwclient Site
+        self.record_lock = threading.Lock() # serializes record()
+
+        # What we've already edited and uploaded, per the record files
+        # on disk.  Keep these in memory, and keep the files open for
+        # appending, so recording an entry doesn't mean rereading them.
+        # They're line-buffered, so each entry hits the disk right away.
+        self.edited = set(slurp('edited.'+domain).split("\n"))
+        self.uploaded = set(slurp('uploaded.'+domain).split("\n"))
+        self.edited_fh = open('edited.'+domain, 'a', buffering=1)
+        self.uploaded_fh = open('uploaded.'+domain, 'a', buffering=1)
         self.login(domain, username, pword)
         self.datadir = datadir
         self.tags = tags
+        self.jobs = jobs
+
+        # Compile the filename regexes for all tags, once
+        self.tag_regexes = [(tag, re.compile(v[1])) for tag, v in c.tags.items()]
+
+        # Current (text, revision timestamp) of the pages we'll edit,
+        # keyed by title; see fetch_page_texts()
+        self.page_text = {}
 
     def edit_pages(self):
         """Edit wiki pages to include links to uploaded files.  Don't edit
         pages that already have links."""
 
-        edited = slurp('edited.'+self.domain)
-        for idnum in self.files.keys():
-            for tag in self.tags:
-                if tag in self.files[idnum]:
-                    fname = "%s_%s%s" % (idnum, tag, os.path.splitext(self.files[idnum][tag])[1])
-                    if fname in edited:
-                        continue
+        for rec in self.files:
+            # If there's no page for these files, skip it
+            page_title = rec['page']
+            if page_title is None:
+                continue
+
+            for tag, _, fname in rec['uploads']:
+                if fname in self.edited:
+                    continue
 
-                    # If there's no page for these files, skip it
-                    if not 'page' in self.files[idnum]:
-                        continue
+                # Get page text, and the timestamp of the revision it
+                # came from.  A Page whose text() we call keeps track
+                # of that itself.
+                page = None
+                timestamp = None
+                if page_title in self.page_text:
+                    text, timestamp = self.page_text[page_title]
+                else:
+                    page = self.site.pages[page_title]
+                    text = page.text()
+
+                # Make text to insert
+                section = c.tags[tag][0]
+                #if tag == 'mou': section='MOU'
+                #if tag == 'team': section='Team Structure'
+                insert = "\n= {0} =\n\n* [[Media:{1}|{0} document]]".format(section, fname)
+
+                # Don't edit twice
+                if insert in text:
+                    self.record_edit(fname) # record if we somehow missed recording last time
+                    continue
 
-                    # Get page text
-                    page_title = self.files[idnum]['page']
+                # Edit and save page.  The link goes above the last
+                # three lines (the colophon), so only split those off.
+                text = text.rsplit("\n", 3)
+                text.insert(-3,insert) 
+                text = "\n".join(text)
+
+                # If the text came from fetch_page_texts(), tell
+                # mediawiki which revision we edited (or that there
+                # was no page), so that it refuses the edit if the page
+                # has changed since, rather than us overwriting that.
+                kwargs = {}
+                if page is None:
+                    if timestamp is None:
+                        kwargs['createonly'] = '1'
+                    else:
+                        kwargs['basetimestamp'] = timestamp
                     page = self.site.pages[page_title]
+                result = page.save(text, summary='Added link for %s' % section, **kwargs)
 
-                    # Make text to insert
-                    section = c.tags[tag][0]
-                    #if tag == 'mou': section='MOU'
-                    #if tag == 'team': section='Team Structure'
-                    insert = "\n= {0} =\n\n* [[Media:{1}|{0} document]]".format(section, fname)
-                    
-                    # Don't edit twice
-                    if insert in page.text():
-                        self.record_edit(fname) # record if we somehow missed recording last time
-                        continue
-
-                    # Edit and save page
-                    text = page.text().split("\n")
-                    text.insert(-3,insert) 
-                    page.save("\n".join(text), summary='Added link for %s' % section)
-
-                    # Log edit
-                    print("Edited %s to link to %s" % (page_title, fname))
-                    self.record_edit(fname)
+                # Another tag's file may link from this page too
+                if 'newtimestamp' in result:
+                    self.page_text[page_title] = (text, result['newtimestamp'])
+                else:
+                    self.page_text.pop(page_title, None)
+
+                # Log edit
+                print("Edited %s to link to %s" % (page_title, fname))
+                self.record_edit(fname)
 
     def gather_files(self):
         """Gather the MOU and Team files, sort them by review number.  Set
-        self.files to a dict with keys that are review numbers that hash to
-        dicts whose keys are 'mou' and 'team' that hash to filenames."""
-
-        self.files = {}
-
-        # Compile the regexes
-        for tag, v in c.tags.items():
-            if type(v[1]) != type(re.compile(' ')):
-                v[1] = re.compile(v[1])
-                
-        for fname in os.listdir(self.datadir):
-            for tag, v in c.tags.items():
-                regex = v[1]
+        self.files to a list with one record per review number, a dict:
+
+            'id': the review number
+            'page': the title of its wiki page (None until gather_pages())
+            'uploads': a list of (tag, local filename, wiki filename)
+                       tuples, one per tag in self.tags that has a file
+
+        upload_files() and edit_pages() just walk this list, rather than
+        looking each file up by review number and tag."""
+
+        fnames = []
+        with os.scandir(self.datadir) as entries:
+            for entry in entries:
+                # Mediawiki refuses empty files, so leave them out
+                # entirely; there'd be nothing to upload or link to.
+                if entry.stat().st_size == 0:
+                    print("Skipping empty file: %s" % entry.name)
+                    continue
+                fnames.append(entry.name)
+
+        found = {}   # review number -> {tag: (local filename, wiki filename)}
+        for fname in fnames:
+            for tag, regex in self.tag_regexes:
                 m = regex.search(fname)
                 if m:
                     idnum = m.groups()[0]
-                    if not idnum in self.files:
-                        self.files[idnum] = {}
-                    self.files[idnum][tag] = fname
+                    if not idnum in found:
+                        found[idnum] = {}
+                    found[idnum][tag] = (fname, wiki_fname(idnum, tag, fname))
                     continue
-                    
+
+        self.files = []
+        for idnum, tagged in found.items():
+            uploads = [(tag,) + tagged[tag] for tag in self.tags if tag in tagged]
+            if uploads:
+                self.files.append({'id': idnum, 'page': None, 'uploads': uploads})
+
     def gather_pages(self):
-        """Add page titles to the self.files dict so we correlate files and pages.
+        """Add page titles to the self.files records so we correlate files and pages.
         
-        For each dict keyed by a review number in self.files, add a new key 'page' that
-        hashes to the title of the page that corresponds to that review number. """ 
+        For each record in self.files, set 'page' to the title of the page that
+        corresponds to its review number. """ 
 
+        by_id = {rec['id']: rec for rec in self.files}
         idnum_regex = re.compile(c.toc_id_regex)
         page = self.site.pages[c.toc]
-        for line in page.text().split("\n"):
-            if not line.startswith("* [["):
-                continue
+        # Only the TOC's entry lines matter; pick them out in one scan
+        for line in TOC_ENTRY_RE.findall(page.text()):
             m = idnum_regex.search(line)
             assert m != None  # Make sure the regex found an id
             idnum = (m.groups()[0])
 
             # There are some gaps becuse we removed files that wouldn't upload properly
-            if not idnum in self.files:
+            if not idnum in by_id:
                 continue
 
             page_title = line[4:-2].replace(' ','_')
-            self.files[idnum]['page'] = page_title
+            by_id[idnum]['page'] = page_title
+
+        self.fetch_page_texts(sorted(set(
+            rec['page'] for rec in self.files if rec['page'] is not None)))
+
+    def fetch_page_texts(self, titles):
+        """Fetch the current text of each page in TITLES, and the
+        timestamp of the revision it's from, into self.page_text.
+
+        edit_pages() needs the text of every page it might edit, so get
+        them 50 at a time (the API's limit for non-bots) rather than
+        with a request per page.
+
+        The API may leave some pages' text out of a reply (when the
+        reply gets too big, it says to continue instead).  Those pages
+        are left out of self.page_text, so edit_pages() fetches them
+        itself."""
+        kwargs = {}
+        if self.site.version[:2] >= (1, 32):
+            kwargs['rvslots'] = 'main'
+        for i in range(0, len(titles), 50):
+            batch = titles[i:i+50]
+            query = self.site.api('query', prop='revisions', rvprop='content|timestamp',
+                                  titles='|'.join(batch), **kwargs)['query']
+
+            # The API reports titles in normalized form (e.g., with
+            # spaces for underscores), so map them back to ours
+            ours = {n['to']: n['from'] for n in query.get('normalized', [])}
+            for page in query['pages'].values():
+                title = ours.get(page['title'], page['title'])
+                if 'missing' in page:
+                    self.page_text[title] = ('', None)
+                elif 'revisions' in page:
+                    rev = page['revisions'][0]
+                    timestamp = rev['timestamp']
+                    if 'slots' in rev:
+                        rev = rev['slots']['main']
+                    self.page_text[title] = (rev['*'], timestamp)
+
+    def connect(self, domain, username, pword):
+        """Return a new mwclient Site for DOMAIN, logged in as USERNAME"""
+        site = mwclient.Site(domain,
+            path='/mwiki/',
+            clients_useragent="upload.py")
+
+        # mwclient sends everything through one requests.Session, so
+        # keep-alive connections already get reused between calls.
+        # Give that session a bigger pool, and retry when a connection
+        # can't be made or an idempotent request (e.g., fetching page
+        # text) fails.  urllib3 won't resend an upload or edit POST
+        # after it has been sent, so those never get applied twice.
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=32,
+                              max_retries=Retry(total=3, backoff_factor=0.3))
+        site.connection.mount("https://", adapter)
+        site.connection.mount("http://", adapter)
+
+        # mwclient sends files bigger than this in a series of chunked
+        # upload requests (rather than one big POST), reading the file
+        # a chunk at a time.  The default is 1 MiB; bigger chunks mean
+        # fewer round trips for big documents.
+        site.chunk_size = 4 * 1024 * 1024
+
+        site.login(username, pword)
+        return site
 
     def login(self, domain, username, pword):
         """Login via mwclient"""
-        self.site = mwclient.Site(domain,
-            path='/mwiki/',
-            clients_useragent="upload.py")
-        self.site.login(username, pword)
+        self.site = self.connect(domain, username, pword)
+
+    def thread_site(self):
+        """Return a logged-in mwclient Site for use by the current thread.
+        mwclient isn't thread-safe, so each upload thread gets its own."""
+        site = getattr(self.local, 'site', None)
+        if site is None:
+            site = self.connect(self.domain, self.username, self.pword)
+            self.local.site = site
+        return site
            
-    def record(self, entry, record_fname):
-        """Record ENTRY as a line in RECORD_FNAME"""
-        if entry in slurp(record_fname).split("\n"):
-            return
-
-        with open(record_fname, 'a') as fh:
+    def close(self):
+        """Close the record files"""
+        self.edited_fh.close()
+        self.uploaded_fh.close()
+
+    def record(self, entry, records, fh):
+        """Record ENTRY in the set RECORDS and as a line in file FH"""
+        # Upload threads record concurrently
+        with self.record_lock:
+            if entry in records:
+                return
+            records.add(entry)
             fh.write("%s\n" % entry)
         
     def record_edit(self, fname):
@@ -148,7 +307,7 @@ class Session():
         Note that FNAME here is the name of the remote file on the wiki, not
         the name of the file in the local direcotyr."""
 
-        self.record(fname, 'edited.'+ self.domain)
+        self.record(fname, self.edited, self.edited_fh)
 
     def record_upload(self, fname):
         """Write the FNAME of the uploaded file to disk so we skip it next time.
@@ -156,63 +315,123 @@ class Session():
         Note that FNAME here is the name of the file in the local direcotry,
         not the name of the remote file in the wiki."""
 
-        self.record(fname, 'uploaded.'+ self.domain)
+        self.record(fname, self.uploaded, self.uploaded_fh)
+
+    def fetch_file_sha1s(self, names):
+        """Return a dict mapping each of the wiki file NAMES that already
+        exists on the wiki to the SHA-1 of its current content.  Ask
+        about 50 files per API request."""
+        sha1s = {}
+        for i in range(0, len(names), 50):
+            batch = names[i:i+50]
+            query = self.site.api('query', prop='imageinfo', iiprop='sha1',
+                                  titles='|'.join('File:' + n for n in batch))['query']
+
+            # The API reports titles in normalized form, so map them
+            # back to ours
+            ours = {n['to']: n['from'] for n in query.get('normalized', [])}
+            for page in query['pages'].values():
+                if 'imageinfo' not in page:
+                    continue   # no such file yet
+                title = ours.get(page['title'], page['title'])
+                sha1s[title[len('File:'):]] = page['imageinfo'][0]['sha1']
+        return sha1s
+
+    def upload_file(self, fname, remote_fname, remote_sha1=None):
+        """Upload FNAME from the data directory to the wiki as REMOTE_FNAME.
+        This runs in an upload thread; see upload_files().
+
+        REMOTE_SHA1 is the SHA-1 of the file already on the wiki under
+        that name, if any.  If FNAME's content matches, don't upload."""
+        fpath = os.path.join(self.datadir, fname)
+        with open(fpath, 'rb') as fh:
+            if remote_sha1 is not None:
+                sha1 = hashlib.sha1()
+                for block in iter(lambda: fh.read(64 * 1024), b''):
+                    sha1.update(block)
+                if sha1.hexdigest() == remote_sha1:
+                    say("Already on the wiki: " + fpath)
+                    self.record_upload(fname)
+                    return
+                fh.seek(0)
+            try:
+                r = self.thread_site().upload(fh,
+                    filename=remote_fname,
+                    description=fname,
+                    ignore=True)
+            except json.decoder.JSONDecodeError:
+                # Sometimes mediawiki replies with html instead of json *facepalm*
+                say("JSON decode error on %s" % fname)
+                say("Such errors were solved in the past by increasing the max file upload size in php.ini and LocalSettings.php")
+                return
+            except mwclient.errors.APIError:
+                if fname.endswith("doc") or fname.endswith("docx"):
+                    say("Doc file treated as a bad zip: %s" % fname)
+                    return
+                else:
+                    raise
+        if r['result'] == 'Success':
+            say("Uploaded " + fpath)
+            self.record_upload(fname)
+            return
+        elif r['result'] == 'Warning':
+            # All this warnings stuff was mostly for debugging.  By
+            # setting ignore=True in the upload options, we blow
+            # through the warnings.  Still, they were useful for
+            # helping identify issues with the document set.
+            if 'exists' in r['warnings']:
+                self.record_upload(fname)
+                return
+            if 'duplicate' in r['warnings']:
+                say("%s is a duplicate of %s" % (fname, r['warnings']['duplicate'][0]))
+                return
+            if 'duplicate-archive' in r['warnings']:
+                say("%s is a duplicate of %s" % (fname, r['warnings']['duplicate-archive']))
+                return
+        say(r)
+        say("Exiting")
 
     def upload_files(self):
         """At this point, we have for every id a page title and the files to
-        upload.  Let's do the uploading."""
-
-        uploaded = slurp("uploaded."+self.domain).split("\n")
-        for idnum in self.files.keys():
-            for tag in self.tags:
-                if tag in self.files[idnum]:
-                    fname = self.files[idnum][tag]
-                    if fname in uploaded:
-                        continue
-                    fpath = os.path.join(self.datadir, fname)
-                    fh = open(fpath, 'rb')
-                    try:
-                        r = self.site.upload(fh,
-                            filename="%s_%s%s" % (idnum, tag, os.path.splitext(fname)[1]),
-                            description=fname,
-                            ignore=True)
-                    except json.decoder.JSONDecodeError:
-                        # Sometimes mediawiki replies with html instead of json *facepalm*
-                        print("JSON decode error on %s" % fname)
-                        print("Such errors were solved in the past by increasing the max file upload size in php.ini and LocalSettings.php")
-                        continue
-                    except mwclient.errors.APIError:
-                        if fname.endswith("doc") or fname.endswith("docx"):
-                            print("Doc file treated as a bad zip: %s" % fname)
-                        else:
-                            raise
-                    if r['result'] == 'Success':
-                        print("Uploaded " + fpath)
-                        self.record_upload(fname)
-                        continue
-                    elif r['result'] == 'Warning':
-                        # All this warnings stuff was mostly for debugging.  By
-                        # setting ignore=True in the upload options, we blow
-                        # through the warnings.  Still, they were useful for
-                        # helping identify issues with the document set.
-                        if 'exists' in r['warnings']:
-                            self.record_upload(fname)
-                            continue
-                        if 'duplicate' in r['warnings']:
-                            print("%s is a duplicate of %s" % (fname, r['warnings']['duplicate'][0]))
-                            continue
-                        if 'duplicate-archive' in r['warnings']:
-                            print("%s is a duplicate of %s" % (fname, r['warnings']['duplicate-archive']))
-                            continue
-                    print(r)
-                    print("Exiting")
+        upload.  Let's do the uploading.
+
+        Uploads are bound by the round trip to the wiki, so self.jobs
+        of them run at once, each thread with its own connection."""
+
+        work = [(fname, remote_fname)
+                for rec in self.files
+                for tag, fname, remote_fname in rec['uploads']
+                if fname not in self.uploaded]
+
+        # Files that are already on the wiki with the same content
+        # needn't be sent again; find out what's there in bulk.
+        remote_sha1s = self.fetch_file_sha1s(
+            [remote_fname for fname, remote_fname in work])
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.jobs) as executor:
+            futures = [executor.submit(self.upload_file, fname, remote_fname,
+                                       remote_sha1s.get(remote_fname))
+                       for fname, remote_fname in work]
+            done, not_done = concurrent.futures.wait(
+                futures, return_when=concurrent.futures.FIRST_EXCEPTION)
+
+            # Stop at the first failure, as uploading one file at a time
+            # did: don't start the uploads still waiting in the queue.
+            # (Those already under way get to finish.)
+            for future in not_done:
+                future.cancel()
+            for future in futures:
+                if future in done:
+                    future.result()
 
 if __name__ == "__main__":
     for d in c.domains:
         print("Working on %s" % d['domain'])
-        session = Session(d['domain'], d['username'], d['password'], c.docdir, d['tags'])
+        session = Session(d['domain'], d['username'], d['password'], c.docdir, d['tags'],
+                          getattr(c, 'jobs', 8))
         session.gather_files()
         session.gather_pages()
         session.upload_files()
         session.edit_pages()
+        session.close()
     print('done')